@@ -40,8 +40,7 @@ class CalloutServerExample(callout_server.CalloutServer):
       service_pb2.BodyResponse: The response containing the mutations to be applied
       to the request body.
     """
-    return callout_tools.add_body_mutation(
-        body.body.decode('utf-8') + '-added-request-body')
+    return callout_tools.add_body_mutation(body.body + b'-added-request-body')
 
   def on_response_body(
       self, body: service_pb2.HttpBody, context: ServicerContext
@@ -49,7 +49,7 @@ class CalloutServerExample(callout_server.CalloutServer):
       service_pb2.HeadersResponse: The response containing the mutations to be applied
       to the request headers.
     """
-    if not callout_tools.header_contains(headers, 'header-check'):
+    if not callout_tools.headers_contain(headers, 'header-check'):
       callout_tools.deny_callout(
         context, '"header-check" not found within the request headers'
       )
@@ -19,6 +19,7 @@ from typing import Union
 import jwt
 
 from typing import Union, Any
+from jwt.algorithms import RSAAlgorithm
 from jwt.exceptions import InvalidTokenError
 
 from grpc import ServicerContext
@@ -58,7 +59,7 @@ def extract_jwt_token(
 
 
 def validate_jwt_token(
-  key: bytes,
+  key: Any,
   request_headers: service_pb2.HttpHeaders,
   algorithm: str,
   context: ServicerContext,
@@ -69,7 +70,8 @@ def validate_jwt_token(
   logs an error and returns None.
 
   Args:
-      key (bytes): The public key used for token validation.
+      key (Any): The public key used for token validation, either as PEM bytes
+                 or as a key object already prepared by the jwt library.
       request_headers (service_pb2.HttpHeaders): The HTTP headers received in the request,
                                                 used to extract the JWT token.
       algorithm (str): The algorithm with which the JWT was signed (e.g., 'RS256').
@@ -116,8 +118,11 @@ class CalloutServerExample(callout_server.CalloutServer):
     self._load_public_key('./extproc/ssl_creds/publickey.pem')
 
   def _load_public_key(self, path: str) -> None:
+    # Parse the PEM data once so that each callout does not pay for key loading.
     with open(path, 'rb') as key_file:
-      self.public_key = key_file.read()
+      self.public_key = RSAAlgorithm(RSAAlgorithm.SHA256).prepare_key(
+        key_file.read()
+      )
 
   def on_request_headers(
     self, headers: service_pb2.HttpHeaders, context: ServicerContext
@@ -18,6 +18,10 @@ from envoy.service.ext_proc.v3 import external_processor_pb2 as service_pb2
 from extproc.service import callout_server
 from extproc.service import callout_tools
 
+# The redirect does not depend on the callout, so build it once.
+_REDIRECT_RESPONSE = callout_tools.header_immediate_response(
+    code=301, headers=[('Location', 'http://service-extensions.com/redirect')])
+
 
 class CalloutServerExample(callout_server.CalloutServer):
   """Example redirect callout server.
@@ -46,9 +50,7 @@ class CalloutServerExample(callout_server.CalloutServer):
       service_pb2.HeadersResponse: The response containing the mutations to be applied
       to the request headers.
     """
-    return callout_tools.header_immediate_response(
-        code=301,
-        headers=[('Location', 'http://service-extensions.com/redirect')])
+    return _REDIRECT_RESPONSE
 
 
 if __name__ == '__main__':
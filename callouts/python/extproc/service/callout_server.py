@@ -19,12 +19,16 @@ Bundled with an optional health check server.
 Can be set up to use ssl certificates.
 """
 
+import asyncio
 from concurrent import futures
+import functools
 from http.server import BaseHTTPRequestHandler
 from http.server import HTTPServer
+import inspect
 import logging
 import ssl
-from typing import Iterator, Union
+import threading
+from typing import Any, Iterator, Union
 from typing import Iterable
 
 from envoy.service.ext_proc.v3.external_processor_pb2 import HttpBody
@@ -39,6 +43,7 @@ from envoy.service.ext_proc.v3.external_processor_pb2_grpc import (
 from envoy.service.ext_proc.v3.external_processor_pb2_grpc import (
     ExternalProcessorServicer,)
 import grpc
+from google.protobuf.internal import api_implementation
 from google.protobuf.struct_pb2 import Struct
 from grpc import ServicerContext
 
@@ -55,6 +60,15 @@ def _addr_to_str(address: tuple[str, int]) -> str:
   return f'{address[0]}:{address[1]}'
 
 
+def _check_protobuf_implementation() -> None:
+  """Warn if protobuf messages are handled by the pure python backend."""
+  if api_implementation.Type() == 'python':
+    logging.warning(
+        'Using the python protobuf implementation, callout messages will be '
+        'slow to parse and build. Set PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION '
+        'to upb or ensure the native backend is installed.')
+
+
 class HealthCheckService(BaseHTTPRequestHandler):
   """Server for responding to health check pings."""
 
@@ -88,6 +102,20 @@ class CalloutServer:
     private_key: PEM private key of the server.
     private_key_path: Relative file path pointing to a file containing private_key data.
     server_thread_count: Threads allocated to the main grpc service.
+    max_concurrent_rpcs: If set, the grpc service rejects new callout streams
+      with RESOURCE_EXHAUSTED while this many are already in flight,
+      rather than queueing them behind the busy service threads.
+
+  The `on_*` callbacks and `process` may also be defined as coroutines
+  (`async def`). These are run on a single event loop shared by all of the
+  grpc service threads, so asyncio clients and their channels can be reused
+  across callouts rather than creating a new event loop per callout.
+  Coroutine callbacks do not add concurrency: the grpc service thread that
+  received the callout blocks until the coroutine completes, so at most
+  server_thread_count callouts are processed at once. A coroutine `process`
+  override should dispatch through `await self.process_async(...)`. Calling
+  `process` from it raises a RuntimeError when the dispatched `on_*`
+  callback is itself a coroutine, and works when the callback is synchronous.
   """
   def __init__(
       self,
@@ -106,11 +134,18 @@ class CalloutServer:
       private_key: bytes | None = None,
       private_key_path: str = './extproc/ssl_creds/privatekey.pem',
       server_thread_count: int = 2,
+      max_concurrent_rpcs: int | None = None,
   ):
     self._setup = False
     self._shutdown = False
     self._closed = False
     self._health_check_server: HTTPServer | None = None
+    self._event_loop: asyncio.AbstractEventLoop | None = None
+    self._event_loop_thread: threading.Thread | None = None
+    self._event_loop_lock = threading.Lock()
+    # The coroutine each callout stream is currently waiting on.
+    self._pending: dict[ServicerContext, futures.Future] = {}
+    self._pending_lock = threading.Lock()
     default_ip = default_ip or '0.0.0.0'
 
     self.address: tuple[str, int] = address or (default_ip, 443)
@@ -137,6 +172,7 @@ class CalloutServer:
       return None
 
     self.server_thread_count = server_thread_count
+    self.max_concurrent_rpcs = max_concurrent_rpcs
     self.secure_health_check = secure_health_check
     # Read cert data.
     self.private_key = private_key or _read_cert_file(private_key_path)
@@ -169,6 +205,7 @@ class CalloutServer:
 
   def _start_servers(self) -> None:
     """Start the requested servers."""
+    _check_protobuf_implementation()
     if self.health_check_address:
       self._health_check_server = HTTPServer(self.health_check_address,
                                              HealthCheckService)
@@ -193,6 +230,103 @@ class CalloutServer:
     if self._callout_server:
       self._callout_server.stop()
 
+    self._stop_event_loop()
+
+  def _get_event_loop(self) -> asyncio.AbstractEventLoop:
+    """Return the shared event loop, starting its thread on first use."""
+    with self._event_loop_lock:
+      if self._event_loop is None:
+        self._event_loop = asyncio.new_event_loop()
+        self._event_loop_thread = threading.Thread(
+            target=self._event_loop.run_forever)
+        self._event_loop_thread.daemon = True
+        self._event_loop_thread.start()
+      return self._event_loop
+
+  def _stop_event_loop(self, timeout: float = 10) -> None:
+    """Cancel outstanding callbacks, then stop and close the shared event loop.
+
+    Cancelling the pending tasks releases any grpc threads still waiting on
+    them in `_resolve`.
+
+    Args:
+        timeout: Seconds to wait for the tasks to cancel and the loop thread
+          to exit.
+    """
+    with self._event_loop_lock:
+      loop, thread = self._event_loop, self._event_loop_thread
+      self._event_loop = self._event_loop_thread = None
+    if loop is None or thread is None:
+      return
+
+    async def _cancel_tasks() -> None:
+      tasks = [
+          task for task in asyncio.all_tasks()
+          if task is not asyncio.current_task()
+      ]
+      for task in tasks:
+        task.cancel()
+      await asyncio.gather(*tasks, return_exceptions=True)
+
+    try:
+      asyncio.run_coroutine_threadsafe(_cancel_tasks(),
+                                       loop).result(timeout=timeout)
+    except futures.TimeoutError:
+      logging.warning('Timed out cancelling pending callout coroutines.')
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=timeout)
+    if thread.is_alive():
+      logging.warning('Callout event loop thread did not stop.')
+    else:
+      loop.close()
+
+  def _resolve(self, value: Any, context: ServicerContext | None) -> Any:
+    """Wait on the result of a coroutine callback.
+
+    Coroutines are scheduled on the shared event loop and the calling grpc
+    thread blocks until they complete. The coroutine is cancelled if the
+    callout stream terminates first, see `process_stream`. Other values are
+    returned as is.
+
+    Args:
+        value: Value returned from a callback.
+        context: Stream context on the callout.
+
+    Returns:
+        The value, or the result of the coroutine.
+
+    Raises:
+        RuntimeError: If called from within a coroutine running on the shared
+          event loop, where blocking on the result would deadlock.
+    """
+    if not inspect.iscoroutine(value):
+      return value
+    if threading.current_thread() is self._event_loop_thread:
+      value.close()
+      raise RuntimeError(
+          'Coroutine callbacks cannot be resolved from the event loop, '
+          'use `await self.process_async(...)` within coroutine overrides.')
+    future = asyncio.run_coroutine_threadsafe(value, self._get_event_loop())
+    if context is None:
+      return future.result()
+    with self._pending_lock:
+      self._pending[context] = future
+    try:
+      # The stream may have ended before the future was registered.
+      if not context.is_active():
+        future.cancel()
+      return future.result()
+    finally:
+      with self._pending_lock:
+        self._pending.pop(context, None)
+
+  def _cancel_pending(self, context: ServicerContext) -> None:
+    """Cancel the coroutine the stream on `context` is waiting on, if any."""
+    with self._pending_lock:
+      future = self._pending.get(context)
+    if future is not None:
+      future.cancel()
+
   def _loop_server(self) -> None:
     """Loop server forever, calling shutdown will cause the server to stop."""
 
@@ -226,8 +360,105 @@ class CalloutServer:
     Yields:
         ProcessingResponse: A response for the incoming callout.
     """
-    if callout.HasField('request_headers'):
-      match self.on_request_headers(callout.request_headers, context):
+    request_type, result = self._dispatch(callout, context)
+    return self._to_response(callout, request_type,
+                             self._resolve(result, context))
+
+  def process_stream(
+      self,
+      callouts: Iterable[ProcessingRequest],
+      context: ServicerContext,
+  ) -> Iterator[ProcessingResponse]:
+    """Process a stream of incomming callouts.
+
+    Called once per callout stream by the grpc service, calls `process` for
+    each callout. A coroutine callback still pending when the stream is
+    cancelled is cancelled with it, and the stream ends quietly.
+
+    Args:
+        callouts: The incomming callouts on the stream.
+        context: Stream context on the callouts.
+
+    Yields:
+        ProcessingResponse: A response for each incoming callout.
+    """
+    context.add_callback(functools.partial(self._cancel_pending, context))
+    try:
+      for callout in callouts:
+        yield self._resolve(self.process(callout, context), context)
+    except futures.CancelledError:
+      if context.is_active():
+        raise
+      logging.debug('Callout stream cancelled.')
+
+  async def process_async(
+      self,
+      callout: ProcessingRequest,
+      context: ServicerContext,
+  ) -> ProcessingResponse:
+    """Process incomming callouts, awaiting any coroutine callbacks.
+
+    Use in place of `process` when overriding `process` with a coroutine.
+
+    Args:
+        callout: The incomming callout.
+        context: Stream context on the callout.
+
+    Returns:
+        ProcessingResponse: A response for the incoming callout.
+    """
+    request_type, result = self._dispatch(callout, context)
+    if inspect.iscoroutine(result):
+      result = await result
+    return self._to_response(callout, request_type, result)
+
+  def _dispatch(
+      self,
+      callout: ProcessingRequest,
+      context: ServicerContext,
+  ) -> tuple[str | None, Any]:
+    """Call the `on_*` callback matching the callout type.
+
+    Args:
+        callout: The incomming callout.
+        context: Stream context on the callout.
+
+    Returns:
+        The callout type and the callback's return value, which may be a
+        coroutine.
+    """
+    request_type = callout.WhichOneof('request')
+    if request_type == 'request_headers':
+      return request_type, self.on_request_headers(callout.request_headers,
+                                                   context)
+    elif request_type == 'response_headers':
+      return request_type, self.on_response_headers(callout.response_headers,
+                                                    context)
+    elif request_type == 'request_body':
+      return request_type, self.on_request_body(callout.request_body, context)
+    elif request_type == 'response_body':
+      return request_type, self.on_response_body(callout.response_body,
+                                                 context)
+    return request_type, None
+
+  def _to_response(
+      self,
+      callout: ProcessingRequest,
+      request_type: str | None,
+      result: Any,
+  ) -> ProcessingResponse:
+    """Wrap a callback's result in a ProcessingResponse.
+
+    Args:
+        callout: The incomming callout.
+        request_type: The callout type returned from `_dispatch`.
+        result: The resolved return value of the callback.
+
+    Returns:
+        ProcessingResponse: A response for the incoming callout.
+    """
+    if request_type == 'request_headers':
+      match result:
         case ProcessingResponse() as processing_response:
           return processing_response
         case ImmediateResponse() as immediate_headers:
@@ -236,20 +467,18 @@ class CalloutServer:
           return ProcessingResponse(request_headers=header_response)
         case _:
           logging.warn("MALFORMED CALLOUT %s", callout)
-    elif callout.HasField('response_headers'):
-      return ProcessingResponse(response_headers=self.on_response_headers(
-          callout.response_headers, context))
-    elif callout.HasField('request_body'):
-      match self.on_request_body(callout.request_body, context):
+    elif request_type == 'response_headers':
+      return ProcessingResponse(response_headers=result)
+    elif request_type == 'request_body':
+      match result:
         case ImmediateResponse() as immediate_body:
           return ProcessingResponse(immediate_response=immediate_body)
         case BodyResponse() | None as body_response:
           return ProcessingResponse(request_body=body_response)
         case _:
           logging.warn("MALFORMED CALLOUT %s", callout)
-    elif callout.HasField('response_body'):
-      return ProcessingResponse(
-          response_body=self.on_response_body(callout.response_body, context))
+    elif request_type == 'response_body':
+      return ProcessingResponse(response_body=result)
     return ProcessingResponse()
 
   def on_request_headers(
@@ -323,7 +552,8 @@ class _GRPCCalloutService(ExternalProcessorServicer):
   def __init__(self, processor, *args, **kwargs):
     self._processor = processor
     self._server = grpc.server(
-        futures.ThreadPoolExecutor(max_workers=processor.server_thread_count))
+        futures.ThreadPoolExecutor(max_workers=processor.server_thread_count),
+        maximum_concurrent_rpcs=processor.max_concurrent_rpcs)
     add_ExternalProcessorServicer_to_server(self, self._server)
     server_credentials = grpc.ssl_server_credentials(
         private_key_certificate_chain_pairs=[(processor.private_key,
@@ -354,5 +584,4 @@ class _GRPCCalloutService(ExternalProcessorServicer):
       context: ServicerContext,
   ) -> Iterator[ProcessingResponse]:
     """Process the client callout."""
-    for callout in callout_iterator:
-      yield self._processor.process(callout, context)
+    yield from self._processor.process_stream(callout_iterator, context)
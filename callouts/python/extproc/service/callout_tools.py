@@ -21,7 +21,6 @@ from envoy.config.core.v3.base_pb2 import HeaderValue
 from envoy.config.core.v3.base_pb2 import HeaderValueOption
 from envoy.service.ext_proc.v3.external_processor_pb2 import HttpBody
 from envoy.service.ext_proc.v3.external_processor_pb2 import HttpHeaders
-from envoy.service.ext_proc.v3.external_processor_pb2 import HeaderMutation
 from envoy.service.ext_proc.v3.external_processor_pb2 import BodyResponse
 from envoy.service.ext_proc.v3.external_processor_pb2 import HeadersResponse
 from envoy.service.ext_proc.v3.external_processor_pb2 import ImmediateResponse
@@ -40,6 +39,26 @@ def _addr(value: str) -> tuple[str, int] | None:
   return (address_values[0], int(address_values[1]))
 
 
+def _append_headers(
+    set_headers: typing.Any,
+    headers: list[tuple[str, str]],
+    append_action: typing.Optional[HeaderValueOption.HeaderAppendAction],
+) -> None:
+  """Append a HeaderValueOption to set_headers for each header tuple.
+
+  Args:
+    set_headers: Repeated HeaderValueOption field to append to.
+    headers: A list of tuples (header, value) to append.
+    append_action: Optional action specifying how headers should be appended.
+  """
+  for k, v in headers:
+    header_value_option = HeaderValueOption(
+        header=HeaderValue(key=k, raw_value=bytes(v, 'utf-8')))
+    if append_action:
+      header_value_option.append_action = append_action
+    set_headers.append(header_value_option)
+
+
 def add_command_line_args() -> argparse.ArgumentParser:
   """Adds command line args that can be passed to the CalloutServer constructor.
 
@@ -118,13 +137,8 @@ def add_header_mutation(
   """
   header_mutation = HeadersResponse()
   if add:
-    for k, v in add:
-      header_value_option = HeaderValueOption(
-          header=HeaderValue(key=k, raw_value=bytes(v, 'utf-8')))
-      if append_action:
-        header_value_option.append_action = append_action
-      header_mutation.response.header_mutation.set_headers.append(
-          header_value_option)
+    _append_headers(header_mutation.response.header_mutation.set_headers, add,
+                    append_action)
   if remove is not None:
     header_mutation.response.header_mutation.remove_headers.extend(remove)
   if clear_route_cache:
@@ -133,7 +147,7 @@ def add_header_mutation(
 
 
 def add_body_mutation(
-    body: str | None = None,
+    body: str | bytes | None = None,
     clear_body: bool = False,
     clear_route_cache: bool = False,
 ) -> BodyResponse:
@@ -144,6 +158,7 @@ def add_body_mutation(
 
   Args:
     body: Body text to replace the current body of the incomming callout.
+      Bytes are used as is, strings are encoded as utf-8.
     clear_body: If true, will clear the body of the incomming callout. 
     clear_route_cache: If true, will enable clear_route_cache on the generated
       BodyResponse.
@@ -153,7 +168,9 @@ def add_body_mutation(
   """
   body_mutation = BodyResponse()
   if body:
-    body_mutation.response.body_mutation.body = bytes(body, 'utf-8')
+    if isinstance(body, str):
+      body = bytes(body, 'utf-8')
+    body_mutation.response.body_mutation.body = body
     if (clear_body):
       logging.warning("body and clear_body are mutually exclusive.")
   else:
@@ -186,12 +203,16 @@ def headers_contain(
 def body_contains(http_body: HttpBody, body: str) -> bool:
   """Check the body for the presence of a substring.
 
+  The substring is encoded and searched for within the raw body bytes, so the
+  body itself is never decoded.
+
   Args:
+    http_body: Body to check.
     body: Body substring to look for.
   Returns:
     True if http_body contains expected_body, false otherwise.
   """
-  return body in http_body.body.decode('utf-8')
+  return bytes(body, 'utf-8') in http_body.body
 
 
 def deny_callout(context, msg: str | None = None) -> None:
@@ -229,15 +250,8 @@ def header_immediate_response(
   immediate_response.status.code = code
 
   if headers:
-    header_mutation = HeaderMutation()
-    for k, v in headers:
-      header_value_option = HeaderValueOption(
-          header=HeaderValue(key=k, raw_value=bytes(v, 'utf-8')))
-      if append_action:
-        header_value_option.append_action = append_action
-      header_mutation.set_headers.append(header_value_option)
-
-    immediate_response.headers.CopyFrom(header_mutation)
+    _append_headers(immediate_response.headers.set_headers, headers,
+                    append_action)
   return immediate_response
 
 
@@ -87,4 +87,15 @@ def test_clear_response_body_handling(server: ClearTestServer) -> None:
     mock_body = service_pb2.HttpBody(body=b'inital-body')
     response = make_request(stub, response_body=mock_body)
 
-    assert response.response_body.response.body_mutation.body == b''
\ No newline at end of file
+    assert response.response_body.response.body_mutation.body == b''
+
+
+def test_bytes_body_mutation() -> None:
+  """Test that bytes bodies are used as the mutation body unchanged."""
+  mutation = callout_tools.add_body_mutation(body=b'mock-body')
+  assert mutation.response.body_mutation.body == b'mock-body'
+  assert mutation == callout_tools.add_body_mutation(body='mock-body')
+
+  non_utf8_body = b'mock-\xff\xfe-body'
+  mutation = callout_tools.add_body_mutation(body=non_utf8_body)
+  assert mutation.response.body_mutation.body == non_utf8_body
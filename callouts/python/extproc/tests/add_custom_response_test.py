@@ -22,6 +22,7 @@ import pytest
 
 from extproc.example.add_custom_response.service_callout_example import (
     CalloutServerExample as CalloutServerTest)
+from extproc.service import callout_tools
 from extproc.tests.basic_grpc_test import (
     make_request,
     setup_server,
@@ -107,3 +108,10 @@ def test_body_validation_failure(server: CalloutServerTest) -> None:
     with pytest.raises(grpc.RpcError) as e:
       make_request(stub, response_body=bad_body)
     assert e.value.code() == grpc.StatusCode.PERMISSION_DENIED
+
+
+def test_body_contains_non_utf8_body() -> None:
+  """Test that body_contains matches within bodies that are not valid utf-8."""
+  body = service_pb2.HttpBody(body=b'\xff\xfe-bad-body-\xc3')
+  assert callout_tools.body_contains(body, 'bad-body')
+  assert not callout_tools.body_contains(body, 'mock')
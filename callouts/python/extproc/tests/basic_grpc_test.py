@@ -13,7 +13,9 @@
 # limitations under the License.
 from __future__ import print_function
 
+import asyncio
 import datetime
+import logging
 from http.server import BaseHTTPRequestHandler
 from http.server import HTTPServer
 import threading
@@ -27,6 +29,8 @@ from envoy.service.ext_proc.v3.external_processor_pb2 import ProcessingResponse
 from envoy.service.ext_proc.v3.external_processor_pb2 import ProcessingRequest
 from envoy.service.ext_proc.v3.external_processor_pb2 import HttpHeaders
 from envoy.service.ext_proc.v3.external_processor_pb2 import HttpBody
+from envoy.service.ext_proc.v3.external_processor_pb2 import BodyResponse
+from envoy.service.ext_proc.v3.external_processor_pb2 import HeadersResponse
 from envoy.service.ext_proc.v3.external_processor_pb2_grpc import ExternalProcessorStub
 import grpc
 import pytest
@@ -34,6 +38,7 @@ import pytest
 from extproc.example.basic.service_callout_example import (
   BasicCalloutServer as CalloutServerTest,
 )
+from extproc.service import callout_server
 from extproc.service.callout_server import CalloutServer, _addr_to_str
 from extproc.service.callout_tools import add_body_mutation, add_header_mutation
 
@@ -277,3 +282,217 @@ def test_custom_server_no_health_check(server: CalloutServerTest) -> None:
   test_server = HTTPServer(address, BaseHTTPRequestHandler)
   del test_server
   assert server._health_check_server is None
+
+
+class AsyncCalloutServer(CalloutServer):
+  """Callout server with coroutine callbacks."""
+
+  async def on_request_body(self, _, __) -> BodyResponse:
+    await asyncio.sleep(0)
+    return add_body_mutation(body='async-body')
+
+  async def on_response_headers(self, _, __) -> HeadersResponse:
+    await asyncio.sleep(0)
+    return add_header_mutation(add=[('async', 'header')])
+
+
+_async_args: dict = {
+    "kwargs": default_kwargs,
+    "test_class": AsyncCalloutServer
+}
+
+
+@pytest.mark.parametrize('server', [_async_args], indirect=True)
+def test_async_callbacks(server: AsyncCalloutServer) -> None:
+  """Test that coroutine callbacks are awaited before responding."""
+  with get_plaintext_channel(server) as channel:
+    stub = ExternalProcessorStub(channel)
+
+    value = make_request(stub, request_body=HttpBody(body=b'body'))
+    assert value.HasField('request_body')
+    assert value.request_body == add_body_mutation(body='async-body')
+
+    value = make_request(stub,
+                         response_headers=HttpHeaders(end_of_stream=True))
+    assert value.HasField('response_headers')
+    assert value.response_headers == add_header_mutation(
+        add=[('async', 'header')])
+
+
+class AsyncProcessServer(AsyncCalloutServer):
+  """Callout server with a coroutine process override."""
+
+  async def process(self, callout: ProcessingRequest,
+                    context) -> ProcessingResponse:
+    await asyncio.sleep(0)
+    return await self.process_async(callout, context)
+
+
+class BlockingProcessServer(AsyncCalloutServer):
+  """Coroutine process override that incorrectly calls the blocking process."""
+
+  async def process(self, callout: ProcessingRequest,
+                    context) -> ProcessingResponse:
+    return super().process(callout, context)
+
+
+_async_process_args: dict = {
+    "kwargs": default_kwargs,
+    "test_class": AsyncProcessServer
+}
+
+_blocking_process_args: dict = {
+    "kwargs": default_kwargs,
+    "test_class": BlockingProcessServer
+}
+
+
+@pytest.mark.parametrize('server', [_async_process_args], indirect=True)
+def test_async_process_default_dispatch(server: AsyncProcessServer) -> None:
+  """Test that a coroutine process override can await the default dispatch."""
+  with get_plaintext_channel(server) as channel:
+    stub = ExternalProcessorStub(channel)
+
+    value = make_request(stub, request_body=HttpBody(body=b'body'))
+    assert value.HasField('request_body')
+    assert value.request_body == add_body_mutation(body='async-body')
+
+    value = make_request(stub,
+                         response_headers=HttpHeaders(end_of_stream=True))
+    assert value.HasField('response_headers')
+    assert value.response_headers == add_header_mutation(
+        add=[('async', 'header')])
+
+
+@pytest.mark.parametrize('server', [_blocking_process_args], indirect=True)
+def test_async_process_blocking_dispatch(server: BlockingProcessServer) -> None:
+  """Test that blocking on a callback from the event loop errors, not hangs."""
+  with get_plaintext_channel(server) as channel:
+    stub = ExternalProcessorStub(channel)
+
+    with pytest.raises(grpc.RpcError) as e:
+      make_request(stub, request_body=HttpBody(body=b'body'))
+    assert e.value.code() == grpc.StatusCode.UNKNOWN
+
+
+class SleepingCalloutServer(CalloutServer):
+  """Callout server with a coroutine callback that never completes."""
+
+  def __init__(self, *args, **kwargs):
+    super().__init__(*args, **kwargs)
+    self.started = threading.Event()
+
+  async def on_request_body(self, _, __) -> BodyResponse:
+    self.started.set()
+    await asyncio.Event().wait()
+    return add_body_mutation()
+
+  def on_response_headers(self, _, __) -> HeadersResponse:
+    return add_header_mutation(add=[('hello', 'service-extensions')])
+
+
+_sleeping_args: dict = {
+    "kwargs": default_kwargs | {
+        'server_thread_count': 1
+    },
+    "test_class": SleepingCalloutServer
+}
+
+
+def _start_sleeping_stream(stub: ExternalProcessorStub,
+                           server: SleepingCalloutServer) -> Any:
+  """Open a stream whose callout is left pending on the sleeping callback."""
+  server.started.clear()
+  call = stub.Process(
+      iter([ProcessingRequest(request_body=HttpBody(body=b'body'))]),
+      timeout=10)
+  assert server.started.wait(timeout=5)
+  return call
+
+
+def _assert_served(stub: ExternalProcessorStub) -> None:
+  """Assert that a new stream is served by the single service thread."""
+  responses = stub.Process(
+      iter([ProcessingRequest(response_headers=HttpHeaders(end_of_stream=True))
+           ]),
+      timeout=5)
+  value = next(responses)
+  assert value.response_headers == add_header_mutation(
+      add=[('hello', 'service-extensions')])
+
+
+@pytest.mark.parametrize('server', [_sleeping_args], indirect=True)
+def test_cancelled_stream_frees_worker(server: SleepingCalloutServer,
+                                       caplog: pytest.LogCaptureFixture) -> None:
+  """Test that cancelling a stream releases its thread without error logs."""
+  with get_plaintext_channel(server) as channel:
+    stub = ExternalProcessorStub(channel)
+    call = _start_sleeping_stream(stub, server)
+    call.cancel()
+    _assert_served(stub)
+  assert not [
+      record for record in caplog.records if record.levelno >= logging.ERROR
+  ]
+
+
+@pytest.mark.parametrize('server', [_sleeping_args], indirect=True)
+def test_stop_event_loop_frees_worker(server: SleepingCalloutServer) -> None:
+  """Test that stopping the event loop releases threads waiting on it."""
+  with get_plaintext_channel(server) as channel:
+    stub = ExternalProcessorStub(channel)
+    call = _start_sleeping_stream(stub, server)
+    server._stop_event_loop()
+    with pytest.raises(grpc.RpcError):
+      next(call)
+    _assert_served(stub)
+
+
+
+_bounded_args: dict = {
+    "kwargs": default_kwargs | {
+        'max_concurrent_rpcs': 1
+    },
+    "test_class": CalloutServerTest
+}
+
+
+@pytest.mark.parametrize('server', [_bounded_args], indirect=True)
+def test_max_concurrent_rpcs(server: CalloutServerTest) -> None:
+  """Test that streams beyond max_concurrent_rpcs are rejected."""
+  release = threading.Event()
+
+  def held_requests() -> Iterator[ProcessingRequest]:
+    yield ProcessingRequest(response_headers=HttpHeaders(end_of_stream=True))
+    # Keep the stream open until the second stream has been rejected.
+    release.wait(timeout=10)
+
+  with get_plaintext_channel(server) as channel:
+    stub = ExternalProcessorStub(channel)
+    held_stream = stub.Process(held_requests())
+    try:
+      value = next(held_stream)
+      assert value.response_headers == add_header_mutation(
+          add=[('hello', 'service-extensions')])
+
+      with pytest.raises(grpc.RpcError) as e:
+        make_request(stub, response_headers=HttpHeaders(end_of_stream=True))
+      assert e.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+    finally:
+      release.set()
+      held_stream.cancel()
+
+
+def test_python_protobuf_warning(monkeypatch: pytest.MonkeyPatch,
+                                 caplog: pytest.LogCaptureFixture) -> None:
+  """Test that the pure python protobuf backend is warned about on startup."""
+  monkeypatch.setattr(callout_server.api_implementation, 'Type',
+                      lambda: 'python')
+  with caplog.at_level(logging.WARNING):
+    callout_server._check_protobuf_implementation()
+  assert 'Using the python protobuf implementation' in caplog.text
+
+  caplog.clear()
+  monkeypatch.setattr(callout_server.api_implementation, 'Type', lambda: 'upb')
+  with caplog.at_level(logging.WARNING):
+    callout_server._check_protobuf_implementation()
+  assert not caplog.records